@@ -0,0 +1,401 @@
+"""
+Bit-parallel regular expression matching on top of the pablo operations.
+
+A pattern is parsed into a small AST and evaluated over whole bit streams, Parabix style. The
+evaluation works with cursor streams: bit p of a cursor stream means "a partial match can
+continue at byte p". Starting from a cursor at every position, each AST node maps a cursor stream
+to the cursor stream after matching that node:
+
+    character class C:  Advance(ScanThru(M & lead(C), nonfinal(C)))
+    concatenation:      apply the parts in turn
+    alternation:        OR of the alternatives
+    C*:                 MatchStar(M, C) = (((M & C) + C) ^ C) | M, using carry propagation
+    r* (general):       iterate r until no new cursors appear
+
+Bounded repetition r{m,n} is expanded into m copies of r followed by n - m optional copies.
+
+Patterns are matched against the UTF-8 bytes of the text. Non-ascii characters and classes are
+compiled into UTF-8 byte sequences, so a class is described by the lead, nonfinal and all-bytes
+streams of the characters it contains.
+
+Supported syntax: literals, '.', [...] and [^...] classes with ranges, escapes (\\n \\t \\r \\f \\v
+\\xhh \\uhhhh, escaped metacharacters, and ascii \\d \\w \\s \\D \\W \\S), groups (...) and (?:...),
+alternation, and the quantifiers *, +, ?, {m}, {m,}, {,n}, {m,n} (lazy forms are accepted, they match
+the same set of substrings). Anchors, backreferences and lookaround are not supported.
+
+The result of a match is the match-end marker stream: bit k is set iff some non-empty substring
+of the text that ends with byte k fully matches the pattern (re.fullmatch). Every match found
+by re.finditer therefore ends at a marked position.
+"""
+from literal_matcher import ByteClassStreams
+from pablo import Advance, ScanThru, transpose_bytes
+
+MAX_CODE_POINT = 0x10FFFF
+SURROGATES = (0xD800, 0xDFFF)
+ASCII_CLASSES = {
+    'd': ((0x30, 0x39),),
+    'w': ((0x30, 0x39), (0x41, 0x5A), (0x5F, 0x5F), (0x61, 0x7A)),
+    's': ((0x09, 0x0D), (0x20, 0x20)),
+}
+SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v', 'a': '\a'}
+EMPTY = ('empty',)
+
+#
+# Parsing
+#
+# AST nodes are tuples:
+#   ('class', ranges)   ranges is a sorted tuple of disjoint (lo, hi) code point ranges
+#   ('cat', nodes)      ('alt', nodes)      ('star', node)      ('opt', node)      ('empty',)
+#
+
+def normalize_ranges(ranges):
+    """Sort and merge code point ranges, dropping surrogates (they never occur in UTF-8 text)."""
+    merged = []
+    for lo, hi in sorted(ranges):
+        for lo, hi in ((lo, min(hi, SURROGATES[0] - 1)), (max(lo, SURROGATES[1] + 1), hi)):
+            if lo > hi:
+                continue
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+    return tuple(merged)
+
+def negate_ranges(ranges):
+    negated = []
+    next_lo = 0
+    for lo, hi in normalize_ranges(ranges):
+        if lo > next_lo:
+            negated.append((next_lo, lo - 1))
+        next_lo = hi + 1
+    if next_lo <= MAX_CODE_POINT:
+        negated.append((next_lo, MAX_CODE_POINT))
+    return normalize_ranges(negated)
+
+class _Parser:
+    """Recursive descent parser: alternation > concatenation > repetition > atom."""
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.pos = 0
+
+    def error(self, message):
+        return ValueError("%s at position %d in pattern %r" % (message, self.pos, self.pattern))
+
+    def peek(self):
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def next(self):
+        c = self.peek()
+        if c is None:
+            raise self.error("Unexpected end of pattern")
+        self.pos += 1
+        return c
+
+    def parse(self):
+        node = self.alternation()
+        if self.peek() is not None:
+            raise self.error("Unbalanced parenthesis")
+        return node
+
+    def alternation(self):
+        alternatives = [self.concatenation()]
+        while self.peek() == '|':
+            self.pos += 1
+            alternatives.append(self.concatenation())
+        return alternatives[0] if len(alternatives) == 1 else ('alt', tuple(alternatives))
+
+    def concatenation(self):
+        parts = []
+        while self.peek() not in (None, '|', ')'):
+            parts.append(self.repetition())
+        if not parts:
+            return EMPTY
+        return parts[0] if len(parts) == 1 else ('cat', tuple(parts))
+
+    def repetition(self):
+        node = self.atom()
+        quantified = False
+        while True:
+            c = self.peek()
+            if c in ('*', '+', '?'):
+                bounds = {'*': (0, None), '+': (1, None), '?': (0, 1)}[c]
+                self.pos += 1
+            elif c == '{' and self.bounds() is not None:
+                bounds = self.bounds()
+                self.pos = self.pattern.index('}', self.pos) + 1
+            else:
+                return node
+            if quantified:
+                raise self.error("Multiple repeat")
+            quantified = True
+            if self.peek() == '?': # lazy quantifier, same set of matches
+                self.pos += 1
+            elif self.peek() == '+':
+                raise self.error("Possessive quantifiers are not supported")
+            node = expand_repetition(node, *bounds)
+
+    def bounds(self):
+        """Return (min, max) if a valid {m}, {m,}, {,n} or {m,n} starts at pos, else None ('{' is a literal)."""
+        end = self.pattern.find('}', self.pos)
+        if end == -1:
+            return None
+        body = self.pattern[self.pos + 1:end]
+        lo, comma, hi = body.partition(',')
+        if not (lo.isdigit() or (comma and lo == '')) or not (hi.isdigit() or hi == '') or not (lo or hi):
+            return None
+        lo = int(lo) if lo else 0
+        hi = (int(hi) if hi else None) if comma else lo
+        if hi is not None and hi < lo:
+            raise self.error("Min repeat greater than max repeat")
+        return lo, hi
+
+    def atom(self):
+        c = self.next()
+        if c == '(':
+            if self.pattern.startswith('?:', self.pos):
+                self.pos += 2
+            elif self.peek() == '?':
+                raise self.error("Only (...) and (?:...) groups are supported")
+            node = self.alternation()
+            if self.peek() != ')':
+                raise self.error("Missing )")
+            self.pos += 1
+            return node
+        if c == '[':
+            return self.char_class()
+        if c == '.':
+            return ('class', negate_ranges([(0x0A, 0x0A)]))
+        if c == '\\':
+            return ('class', self.escape())
+        if c in '*+?':
+            raise self.error("Nothing to repeat")
+        if c in '^$':
+            raise self.error("Anchors are not supported")
+        if c == ')':
+            raise self.error("Unbalanced parenthesis")
+        return ('class', ((ord(c), ord(c)),))
+
+    def escape(self):
+        """Parse the escape after a backslash and return its code point ranges."""
+        c = self.next()
+        if c.lower() in ASCII_CLASSES:
+            ranges = ASCII_CLASSES[c.lower()]
+            return normalize_ranges(ranges) if c.islower() else negate_ranges(ranges)
+        if c in SIMPLE_ESCAPES:
+            return ((ord(SIMPLE_ESCAPES[c]),) * 2,)
+        if c in 'xu':
+            num_digits = 2 if c == 'x' else 4
+            digits = self.pattern[self.pos:self.pos + num_digits]
+            if len(digits) != num_digits or any(d not in '0123456789abcdefABCDEF' for d in digits):
+                raise self.error("Bad \\%s escape" % c)
+            self.pos += num_digits
+            return ((int(digits, 16),) * 2,)
+        if c.isalnum():
+            raise self.error("Unsupported escape \\" + c)
+        return ((ord(c), ord(c)),)
+
+    def char_class(self):
+        negated = self.peek() == '^'
+        if negated:
+            self.pos += 1
+        ranges = []
+        first = True
+        while first or self.peek() != ']':
+            first = False
+            lo = self.class_item()
+            if self.peek() == '-' and self.pattern[self.pos + 1:self.pos + 2] not in (']', ''):
+                self.pos += 1
+                hi = self.class_item()
+                if len(lo) != 1 or len(hi) != 1 or lo[0][0] != lo[0][1] or hi[0][0] != hi[0][1]:
+                    raise self.error("Bad character range")
+                if hi[0][0] < lo[0][0]:
+                    raise self.error("Bad character range")
+                ranges.append((lo[0][0], hi[0][0]))
+            else:
+                ranges.extend(lo)
+        self.pos += 1
+        return ('class', negate_ranges(ranges) if negated else normalize_ranges(ranges))
+
+    def class_item(self):
+        c = self.next()
+        if c == '\\':
+            return self.escape()
+        return ((ord(c), ord(c)),)
+
+def expand_repetition(node, min_count, max_count):
+    """Expand node{min_count,max_count} (max_count None means unbounded) into cat/opt/star nodes."""
+    parts = [node] * min_count
+    if max_count is None:
+        parts.append(('star', node))
+    else:
+        parts.extend([('opt', node)] * (max_count - min_count))
+    if not parts:
+        return EMPTY
+    return parts[0] if len(parts) == 1 else ('cat', tuple(parts))
+
+def parse(pattern):
+    """Parse pattern into an AST (see the node types above). Raises ValueError for unsupported syntax."""
+    return _Parser(pattern).parse()
+
+def nullable(node):
+    """True if node matches the empty string."""
+    kind = node[0]
+    if kind == 'class':
+        return False
+    if kind == 'cat':
+        return all(nullable(part) for part in node[1])
+    if kind == 'alt':
+        return any(nullable(part) for part in node[1])
+    return True # star, opt, empty
+
+#
+# UTF-8 compilation of character classes
+#
+
+def utf8_sequences(lo, hi):
+    """
+    Split the code point range [lo, hi] into UTF-8 byte range sequences.
+
+    Each sequence is a list of (lo, hi) byte ranges, one per byte of the encoding, and the range
+    is exactly the union of the byte strings matched by the sequences.
+    Example:
+        utf8_sequences(0x61, 0x100) = [[(0x61, 0x7F)], [(0xC2, 0xC3), (0x80, 0xBF)], [(0xC4, 0xC4), (0x80, 0x80)]]
+    """
+    sequences = []
+    stack = [(lo, hi)]
+    while stack:
+        lo, hi = stack.pop()
+        # ranges must not cross an encoded length boundary
+        boundary = next((b for b in (0x7F, 0x7FF, 0xFFFF) if lo <= b < hi), None)
+        if boundary is not None:
+            stack.extend([(boundary + 1, hi), (lo, boundary)])
+            continue
+        # continuation bytes must cover their full 6 bit range except in the lowest position
+        for i in range(1, len(chr(lo).encode())):
+            m = (1 << (6 * i)) - 1
+            if lo & ~m != hi & ~m:
+                if lo & m:
+                    stack.extend([((lo | m) + 1, hi), (lo, lo | m)])
+                    break
+                if hi & m != m:
+                    stack.extend([(hi & ~m, hi), (lo, (hi & ~m) - 1)])
+                    break
+        else:
+            sequences.append(list(zip(chr(lo).encode(), chr(hi).encode())))
+    return sorted(sequences, key=lambda seq: seq[0])
+
+class _Evaluator:
+    """Evaluates ASTs over the basis bit streams of one input, caching class streams."""
+    def __init__(self, basis_bits, length):
+        self.length = length
+        self.bytes = ByteClassStreams(basis_bits, length)
+        self.cursor_mask = (1 << (length + 1)) - 1 # cursors range over 0..length
+        continuation = self.bytes.byte_range(0x80, 0xBF)
+        self.boundaries = ~continuation & self.cursor_mask # cursor positions between characters
+        self.class_cache = {}
+
+    def class_streams(self, ranges):
+        """Return (lead, nonfinal, all_bytes) streams for the characters in ranges."""
+        if ranges not in self.class_cache:
+            lead = nonfinal = all_bytes = 0
+            for lo, hi in ranges:
+                for sequence in utf8_sequences(lo, hi):
+                    final = self.bytes.byte_range(*sequence[0])
+                    for byte_range in sequence[1:]:
+                        final = Advance(final) & self.bytes.byte_range(*byte_range)
+                    char_bytes = final
+                    for i in range(1, len(sequence)):
+                        char_bytes |= final >> i
+                    lead |= final >> (len(sequence) - 1)
+                    nonfinal |= char_bytes & ~final
+                    all_bytes |= char_bytes
+            self.class_cache[ranges] = (lead, nonfinal, all_bytes)
+        return self.class_cache[ranges]
+
+    def match(self, node, cursors):
+        """Return the cursors after matching node (possibly empty) from cursors."""
+        kind = node[0]
+        if not cursors or kind == 'empty':
+            return cursors
+        if kind == 'class':
+            lead, nonfinal, _ = self.class_streams(node[1])
+            return Advance(ScanThru(cursors & lead, nonfinal))
+        if kind == 'cat':
+            for part in node[1]:
+                cursors = self.match(part, cursors)
+            return cursors
+        if kind == 'alt':
+            result = 0
+            for alternative in node[1]:
+                result |= self.match(alternative, cursors)
+            return result
+        if kind == 'opt':
+            return cursors | self.match(node[1], cursors)
+        # star
+        body = node[1]
+        if body[0] == 'class':
+            # MatchStar through all bytes of the class, then keep only character boundaries
+            _, _, all_bytes = self.class_streams(body[1])
+            reached = (((cursors & all_bytes) + all_bytes) ^ all_bytes) | cursors
+            return reached & self.boundaries
+        reached = frontier = cursors
+        while frontier:
+            frontier = self.match(body, frontier) & ~reached
+            reached |= frontier
+        return reached
+
+    def match_nonempty(self, node, cursors):
+        """Return the cursors after matching node from cursors while consuming at least one byte."""
+        kind = node[0]
+        if not cursors or kind == 'empty':
+            return 0
+        if kind == 'class':
+            return self.match(node, cursors)
+        if kind == 'cat':
+            # empty: cursors reached with every part so far matching empty
+            # consumed: cursors reached with at least one byte consumed
+            empty, consumed = cursors, 0
+            for part in node[1]:
+                consumed = self.match(part, consumed) | self.match_nonempty(part, empty)
+                empty = empty if nullable(part) else 0
+            return consumed
+        if kind == 'alt':
+            result = 0
+            for alternative in node[1]:
+                result |= self.match_nonempty(alternative, cursors)
+            return result
+        if kind == 'opt':
+            return self.match_nonempty(node[1], cursors)
+        # star: one non-empty iteration followed by any number of iterations
+        return self.match(node, self.match_nonempty(node[1], cursors))
+
+    def match_ends(self, node):
+        starts = (1 << self.length) - 1
+        return self.match_nonempty(node, starts) >> 1
+
+def compile_regex(pattern):
+    """Parse pattern (or return it unchanged if it is already an AST)."""
+    return parse(pattern) if isinstance(pattern, str) else pattern
+
+def match_ends_many(patterns, text):
+    """
+    Return {pattern: match-end marker stream} for every pattern.
+
+    The text is transposed once and character class streams are shared between the patterns,
+    so the per-pattern cost is a handful of stream operations per AST node.
+    """
+    byte_data = text.encode() if isinstance(text, str) else text
+    evaluator = _Evaluator(transpose_bytes(byte_data), len(byte_data))
+    return {pattern: evaluator.match_ends(compile_regex(pattern)) for pattern in patterns}
+
+def match_ends(pattern, text):
+    """
+    Return the match-end marker stream of pattern in text (str or UTF-8 bytes).
+
+    Example:
+        text =                    ab aab b abab
+        pattern = a+b
+        match_ends(pattern, text) .1...1....1.1
+        (streams printed in reading order, as by bitstream2string)
+    """
+    return match_ends_many([pattern], text)[pattern]
@@ -0,0 +1,261 @@
+"""
+Generates golden PDEP kernel dumps for arbitrary text files.
+
+The Parabix PDEP kernel pipeline prints, for every block it processes, the unswizzled source
+blocks, the PDEP marker stream block and the swizzled result blocks (see format_values in
+helper_functions.py). Those dumps used to be captured by hand. This module computes the same
+sequence directly from the text, so golden corpora can be built for any input.
+
+The source streams and the PDEP marker stream are defined by class specs:
+    'wordstart'  - first byte of every run of non-whitespace bytes
+    '[abc]'      - every byte of the characters a, b, c
+    '[^abc]'     - the negation of [abc]. Like the kernel, negated classes are not masked
+                   to EOF, so the padding of the final block is all 1s.
+Escapes such as '[\\n]' are allowed in specs.
+
+The default specs reproduce the wc based pipeline used to capture Resources/unicodetest_output.txt.
+Resources/unicodetest_dense_output.txt was captured with the fourth source stream and the
+marker swapped: --source wordstart '[\\n]' '[ ]' '[a]' --marker '[^ ]'.
+
+The input is read in chunks and block sets are produced one at a time, so memory use does not
+depend on the size of the input.
+
+Usage:
+    python dump_generator.py Resources/wctest.txt -o wctest_output.txt
+    python dump_generator.py big.txt --marker '[^ ]' --format binary -o big_output.bin
+"""
+import argparse
+import sys
+from collections import deque, namedtuple
+from pablo import byte_class_stream, swizzle
+
+CharClass = namedtuple('CharClass', ['characters', 'negated'])
+
+WORD_STARTS = 'wordstart'
+WHITESPACE = b' \t\n\v\f\r'
+DEFAULT_SOURCE_CLASSES = [WORD_STARTS, '[\\n]', '[ ]', '[^ ]']
+DEFAULT_MARKER_CLASS = '[a]'
+CHUNK_SIZE = 1 << 16
+LABEL_WIDTH = 41 # labels are left justified in a 41 character column, as in the kernel's output
+
+def parse_class_spec(spec):
+    """Parse a class spec ('wordstart', '[abc]' or '[^abc]') into WORD_STARTS or a CharClass."""
+    if spec == WORD_STARTS:
+        return WORD_STARTS
+    if len(spec) < 2 or spec[0] != '[' or spec[-1] != ']':
+        raise ValueError("Class spec must be 'wordstart', '[...]' or '[^...]', got " + repr(spec))
+    body = spec[1:-1]
+    negated = body.startswith('^')
+    if negated:
+        body = body[1:]
+    # decode backslash escapes without mangling non-ascii characters
+    characters = body.encode('latin-1', 'backslashreplace').decode('unicode_escape')
+    if not characters:
+        raise ValueError("Class spec must contain at least one character, got " + repr(spec))
+    return CharClass(frozenset(characters), negated)
+
+def split_incomplete_utf8(data):
+    """Split data into (complete, tail) where tail is a UTF-8 sequence cut off by the end of data."""
+    for i in range(1, min(4, len(data) + 1)):
+        byte = data[-i]
+        if byte & 0xC0 == 0x80: # continuation byte, keep looking for the lead byte
+            continue
+        if byte >= 0xC0 and 8 - (byte ^ 0xFF).bit_length() > i:
+            return data[:-i], data[-i:]
+        break
+    return data, b''
+
+def char_class_stream(chunk, char_class):
+    """Mark every byte of every character of chunk that is in char_class (ignoring negation).
+
+    Mirrors create_pext_ms in pablo.py: all bytes of a multi-byte character are marked. The chunk
+    must not start or end in the middle of a UTF-8 sequence.
+    """
+    ascii_bytes = [ord(c) for c in char_class.characters if ord(c) < 0x80]
+    class_stream = byte_class_stream(chunk, ascii_bytes)
+    for c in char_class.characters:
+        if ord(c) < 0x80:
+            continue
+        encoded = c.encode()
+        char_mask = (1 << len(encoded)) - 1
+        pos = chunk.find(encoded)
+        while pos != -1:
+            class_stream |= char_mask << pos
+            pos = chunk.find(encoded, pos + len(encoded))
+    return class_stream
+
+class _BlockBuffer:
+    """Accumulates the bits of a stream chunk by chunk and hands them out a block at a time."""
+    def __init__(self, block_width):
+        self.block_width = block_width
+        self.bits = 0
+        self.length = 0
+
+    def append(self, bits, length):
+        self.bits |= bits << self.length
+        self.length += length
+
+    def pop_block(self):
+        block = self.bits & ((1 << self.block_width) - 1)
+        self.bits >>= self.block_width
+        self.length = max(self.length - self.block_width, 0)
+        return block
+
+class _SourceQueue:
+    """FIFO of source blocks. PDEP consumes bits from the front, at most one block's worth at a time."""
+    def __init__(self, block_width):
+        self.block_width = block_width
+        self.blocks = deque()
+        self.offset = 0
+
+    def append(self, block):
+        self.blocks.append(block)
+
+    def take(self, num_bits):
+        """Remove and return the next num_bits bits. Missing bits (not yet supplied) are 0."""
+        value = 0
+        taken = 0
+        while taken < num_bits and self.blocks:
+            count = min(self.block_width - self.offset, num_bits - taken)
+            value |= ((self.blocks[0] >> self.offset) & ((1 << count) - 1)) << taken
+            taken += count
+            self.offset += count
+            if self.offset == self.block_width:
+                self.blocks.popleft()
+                self.offset = 0
+        return value
+
+def marker_fields(marker_stream):
+    """Return the (shift, width) of every field (run of 1s) in marker_stream, right to left.
+
+    Uses low-bit isolation instead of a bit-by-bit scan.
+    Example:
+        marker_stream = 0111000110
+        fields = [(1, 2), (6, 3)]
+    """
+    fields = []
+    while marker_stream:
+        shift = (marker_stream & -marker_stream).bit_length() - 1
+        run = marker_stream >> shift
+        width = (~run & (run + 1)).bit_length() - 1 # number of trailing 1s
+        fields.append((shift, width))
+        marker_stream ^= ((1 << width) - 1) << shift
+    return fields
+
+def deposit(source_bit_stream, fields):
+    """PDEP source_bit_stream into the fields returned by marker_fields. Equivalent to apply_pdep."""
+    result = 0
+    for shift, width in fields:
+        result |= (source_bit_stream & ((1 << width) - 1)) << shift
+        source_bit_stream >>= width
+    return result
+
+def generate_block_sets(source_file, marker_class=DEFAULT_MARKER_CLASS,
+                        source_classes=DEFAULT_SOURCE_CLASSES, block_width=256, chunk_size=CHUNK_SIZE):
+    """
+    Yield the (input_blocks, pdep_ms_block, output_blocks) tuple of each block set, in the same
+    format as format_values in helper_functions.py.
+
+    Args:
+        source_file: Binary file object containing the UTF-8 text to process.
+        marker_class (str): Class spec of the PDEP marker stream.
+        source_classes (list of str): Class specs of the source streams. There must be one source
+            stream per swizzle lane, i.e. the number of source classes is the swizzle factor.
+        block_width (int): The width of a block in the Parabix program.
+        chunk_size (int): Number of bytes to read from source_file at a time.
+    """
+    specs = [parse_class_spec(spec) for spec in source_classes] + [parse_class_spec(marker_class)]
+    num_streams = len(source_classes)
+    block_mask = (1 << block_width) - 1
+    buffers = [_BlockBuffer(block_width) for _ in specs]
+    queues = [_SourceQueue(block_width) for _ in range(num_streams)]
+    prev_is_whitespace = 1 # the start of the file counts as whitespace for wordstart
+    tail = b''
+    at_eof = False
+
+    while not at_eof:
+        data = source_file.read(chunk_size)
+        at_eof = not data
+        chunk, tail = split_incomplete_utf8(tail + data) if data else (tail, b'')
+        if chunk:
+            chunk_mask = (1 << len(chunk)) - 1
+            whitespace = byte_class_stream(chunk, WHITESPACE)
+            for spec, buffer in zip(specs, buffers):
+                if spec == WORD_STARTS:
+                    class_stream = ~whitespace & chunk_mask & ((whitespace << 1) | prev_is_whitespace)
+                else:
+                    class_stream = char_class_stream(chunk, spec)
+                buffer.append(class_stream, len(chunk))
+            prev_is_whitespace = (whitespace >> (len(chunk) - 1)) & 1
+
+        # Emit full blocks, and the final partial block once the input is exhausted
+        while buffers[0].length >= block_width or (at_eof and buffers[0].length > 0):
+            blocks = []
+            for spec, buffer in zip(specs, buffers):
+                block = buffer.pop_block()
+                if spec != WORD_STARTS and spec.negated:
+                    block ^= block_mask
+                blocks.append(block)
+            input_blocks, pdep_ms_block = blocks[:num_streams], blocks[num_streams]
+
+            fields = marker_fields(pdep_ms_block)
+            num_bits = sum(width for _, width in fields)
+            output_streams = []
+            for queue, input_block in zip(queues, input_blocks):
+                queue.append(input_block)
+                output_streams.append(deposit(queue.take(num_bits), fields))
+            yield input_blocks, pdep_ms_block, swizzle(output_streams, num_streams, block_width)
+
+def write_console(block_sets, out, block_width=256):
+    """Write block sets in the kernel's console format (hex bytes, most significant byte first)."""
+    num_bytes = block_width // 8
+    def line(label, block):
+        return label.ljust(LABEL_WIDTH) + '= ' + block.to_bytes(num_bytes, 'big').hex(' ') + '\n'
+    for input_blocks, pdep_ms_block, output_blocks in block_sets:
+        out.write(''.join([line('source block', b) for b in input_blocks]
+                          + [line('PDEP_ms_blk', pdep_ms_block)]
+                          + [line('result_swizzle', b) for b in output_blocks]))
+
+def write_binary(block_sets, out, block_width=256):
+    """Write block sets as raw little-endian blocks: source blocks, PDEP block, result swizzles."""
+    num_bytes = block_width // 8
+    for input_blocks, pdep_ms_block, output_blocks in block_sets:
+        out.write(b''.join(b.to_bytes(num_bytes, 'little')
+                           for b in input_blocks + [pdep_ms_block] + output_blocks))
+
+def read_binary(in_file, num_input_blocks=4, block_width=256):
+    """Yield the block sets stored in a file written by write_binary."""
+    num_bytes = block_width // 8
+    block_set_size = num_bytes * (2 * num_input_blocks + 1)
+    while True:
+        data = in_file.read(block_set_size)
+        if not data:
+            return
+        if len(data) != block_set_size:
+            raise ValueError("Truncated block set at end of binary dump")
+        blocks = [int.from_bytes(data[i:i + num_bytes], 'little') for i in range(0, block_set_size, num_bytes)]
+        yield blocks[:num_input_blocks], blocks[num_input_blocks], blocks[num_input_blocks + 1:]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a golden PDEP kernel dump for a text file.")
+    parser.add_argument('input', help="UTF-8 text file to process")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('--marker', default=DEFAULT_MARKER_CLASS, help="class spec of the PDEP marker stream")
+    parser.add_argument('--source', nargs='+', default=DEFAULT_SOURCE_CLASSES, help="class specs of the source streams")
+    parser.add_argument('--format', choices=['console', 'binary'], default='console')
+    parser.add_argument('--block-width', type=int, default=256)
+    args = parser.parse_args(argv)
+
+    with open(args.input, 'rb') as source_file:
+        block_sets = generate_block_sets(source_file, args.marker, args.source, args.block_width)
+        if args.format == 'binary':
+            out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+            write_binary(block_sets, out, args.block_width)
+        else:
+            out = open(args.output, 'w') if args.output else sys.stdout
+            write_console(block_sets, out, args.block_width)
+        if args.output:
+            out.close()
+
+if __name__ == '__main__':
+    main()
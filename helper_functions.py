@@ -1,7 +1,12 @@
 """
 Contains helper functions used in test_pdep_kernel.py
 """
-from pablo import apply_pdep, swizzle, get_popcount
+from collections import namedtuple
+import pablo
+from pablo import swizzle
+
+Mismatch = namedtuple('Mismatch', ['block_set', 'lane', 'field', 'bit_offset',
+                                   'source_offset', 'expected_bit', 'actual_bit'])
 
 def format_values(console_output, num_input_blocks, num_block_sets=1):
         """
@@ -62,7 +67,100 @@ def format_values(console_output, num_input_blocks, num_block_sets=1):
 
         return block_sets
 
-def compare_expected_actual(tester, block_sets, block_width=256, num_input_blocks=4):
+def locate_mismatches(expected_output, actual_output, block_set_idx=0, block_width=256):
+    """
+    Find every bit that differs between the expected and actual swizzles of a single block set.
+
+    We XOR each expected swizzle against the actual swizzle and walk the set bits of the difference
+    with the low-bit trick (diff & -diff isolates the lowest set bit, bit_length gives its position),
+    so the work done is proportional to the number of differing bits rather than the block size.
+
+    Each differing bit is mapped back through the swizzle: bit pos of swizzle lane i lives in field
+    pos / field_width, which holds column i of stream (field), so the bit describes byte
+    i * field_width + pos % field_width of the block set (see swizzle in pablo.py).
+
+    Args:
+        expected_output (list of int): The swizzled blocks produced by the Parabix kernel.
+        actual_output (list of int): The swizzled blocks produced by the Python PDEP/swizzle functions.
+        block_set_idx (int): Index of the block set being compared. Used to compute source offsets.
+        block_width (int): The width of a block in the Parabix program.
+    Returns:
+        mismatches (list of Mismatch): One entry per differing bit, ordered by source byte offset.
+    Example:
+        block_width = 32, 4 lanes, so field_width = 8
+        expected lane 1: 00000000 00000000 00000100 00000000
+        actual lane 1:   00000000 00000000 00000000 00000000
+
+        diff bit 10 -> field 1 (stream 1), bit offset 2, source offset 1 * 8 + 2 = 10
+    """
+    swizzle_factor = len(expected_output)
+    field_width = block_width // swizzle_factor
+    mismatches = []
+    for lane in range(swizzle_factor):
+        expected = expected_output[lane]
+        diff = expected ^ actual_output[lane]
+        while diff:
+            low_bit = diff & -diff
+            pos = low_bit.bit_length() - 1
+            diff ^= low_bit
+            field, bit_offset = divmod(pos, field_width)
+            source_offset = block_set_idx * block_width + lane * field_width + bit_offset
+            expected_bit = (expected >> pos) & 1
+            mismatches.append(Mismatch(block_set_idx, lane, field, bit_offset,
+                                       source_offset, expected_bit, expected_bit ^ 1))
+    mismatches.sort(key=lambda m: (m.source_offset, m.field))
+    return mismatches
+
+def char_at_byte_offset(source_bytes, byte_offset):
+    """
+    Return (char_start, character) for the UTF-8 character that contains byte_offset.
+
+    Walks back over at most three continuation bytes (10xxxxxx) to find the lead byte, so the
+    lookup is constant time. Returns (byte_offset, None) if the offset lies past the end of the
+    source (e.g. in the zero padding of the final block).
+    """
+    if byte_offset >= len(source_bytes):
+        return byte_offset, None
+    char_start = byte_offset
+    while char_start > 0 and byte_offset - char_start < 3 and source_bytes[char_start] & 0xC0 == 0x80:
+        char_start -= 1
+    lead = source_bytes[char_start]
+    if lead < 0x80:
+        seq_len = 1
+    else:
+        seq_len = 8 - (lead ^ 0xFF).bit_length() # number of leading 1s in the lead byte
+    character = source_bytes[char_start:char_start + max(seq_len, 1)].decode('utf-8', errors='replace')
+    return char_start, character
+
+def format_mismatch_report(mismatches, source_bytes=None, max_listed=10):
+    """
+    Build a human readable report for the mismatches returned by locate_mismatches.
+
+    The first mismatch (lowest source offset) is described in full. If source_bytes (the UTF-8
+    encoded text the kernel was run on) is provided, each source offset is mapped back to the
+    character it belongs to.
+    """
+    if not mismatches:
+        return "no mismatches"
+    first = mismatches[0]
+    lines = ["%d mismatched bit(s); first in block set %d, swizzle lane %d, field %d, bit offset %d"
+             % (len(mismatches), first.block_set, first.lane, first.field, first.bit_offset)]
+    for m in mismatches[:max_listed]:
+        line = ("  block set %d lane %d field %d bit %d: source byte %d expected %d actual %d"
+                % (m.block_set, m.lane, m.field, m.bit_offset, m.source_offset,
+                   m.expected_bit, m.actual_bit))
+        if source_bytes is not None:
+            char_start, character = char_at_byte_offset(source_bytes, m.source_offset)
+            if character is None:
+                line += " (past end of source)"
+            else:
+                line += " (char %r starting at byte %d)" % (character, char_start)
+        lines.append(line)
+    if len(mismatches) > max_listed:
+        lines.append("  ... %d more" % (len(mismatches) - max_listed))
+    return '\n'.join(lines)
+
+def compare_expected_actual(tester, block_sets, block_width=256, num_input_blocks=4, source_bytes=None, backend=pablo):
     """
     For each block set, compare expected values (the output from the Python PDEP function) with the
     actual output from the Parabix PDEP function.
@@ -77,6 +175,10 @@ def compare_expected_actual(tester, block_sets, block_width=256, num_input_block
             together into a single, long input block that gets passed to the Python program (Python has unlimited
             precision ints so we do everything at once instead of breaking the input into blocks).
         num_input_blocks (int): The number of input (and output) blocks in a single block set.
+        source_bytes (bytes): Optional UTF-8 encoded text the kernel was run on. When given, the
+            mismatch report maps differing bits back to the characters they came from.
+        backend (module): Module providing apply_pdep and get_popcount, e.g. pablo (int streams) or
+            wordstream (word-array streams).
 
     """
     input_streams = [0] * num_input_blocks
@@ -97,16 +199,18 @@ def compare_expected_actual(tester, block_sets, block_width=256, num_input_block
             # print(hex(input_streams[i]))
             # print("input_stream " + str(i))
             # print(hex(input_streams[i] >> num_bits_consumed))
-            apply_pdep(output_streams, i, pdep_ms, input_streams[i] >> num_bits_consumed)
+            backend.apply_pdep(output_streams, i, pdep_ms, input_streams[i] >> num_bits_consumed)
             # print("unswizzled output " + str(i))
             # print(hex(output_streams[i]))
             # print("number bits consumed " + str(num_bits_consumed))
 
-        num_bits_consumed += get_popcount(pdep_ms)
-        swizzled_results = swizzle(output_streams, num_input_blocks)
+        num_bits_consumed += backend.get_popcount(pdep_ms)
+        swizzled_results = swizzle(output_streams, num_input_blocks, block_width)
         # for i in range(num_input_blocks):
         #     print("expected_output " + str(i))
         #     print(hex(expected_output[i]))
         #     print ("swizzled output " + str(i))
         #     print(hex(swizzled_results[i]))
-        tester.assertEqual(expected_output, swizzled_results)
\ No newline at end of file
+        if expected_output != swizzled_results:
+            mismatches = locate_mismatches(expected_output, swizzled_results, j, block_width)
+            tester.fail(format_mismatch_report(mismatches, source_bytes))
\ No newline at end of file
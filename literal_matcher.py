@@ -0,0 +1,110 @@
+"""
+Bit-parallel multi-literal matching.
+
+pablo.match checks one literal at one marker position, one byte at a time. Here every literal of
+a set is matched at every position of the input at once:
+
+    match("abc") = Advance(Advance(cc('a')) & cc('b')) & cc('c')
+
+where cc(x) is the character class stream of byte x, computed from the basis bit streams.
+Literals are arranged in a trie so a shared prefix ("WARN" in "WARN" and "WARNING") is evaluated
+only once, and a subtree is skipped as soon as its prefix stream is empty. The result for each
+literal is its match-end marker stream: a 1 bit at the last byte of every occurrence.
+
+Literals and text are matched as UTF-8 bytes, so non-ascii literals work as well.
+"""
+from pablo import Advance, transpose_bytes
+
+class ByteClassStreams:
+    """
+    Computes (and caches) character class streams from the eight basis bit streams.
+
+    The stream of byte value b is the AND of basis_bits[i] or its complement for each bit i. We
+    build it from the most significant bit down and cache every partial AND, so bytes sharing
+    their high bits (e.g. all lowercase letters) share most of the work.
+    """
+    def __init__(self, basis_bits, length):
+        self.basis_bits = basis_bits
+        self.EOF_mask = (1 << length) - 1
+        self.cache = {(8, 0): self.EOF_mask} # (k, b >> k) -> bytes whose bits 7..k equal those of b
+
+    def byte(self, b):
+        """Return the stream marking every occurrence of byte value b."""
+        return self._high_bits(0, b)
+
+    def byte_range(self, lo, hi):
+        """Return the stream marking every byte with value in [lo, hi].
+
+        The range is covered by aligned blocks of 2**k values (all bytes sharing bits 7..k), so it
+        costs at most 14 cached streams rather than one per byte value.
+        """
+        stream = 0
+        while lo <= hi:
+            k = 0
+            while k < 8 and lo % (2 << k) == 0 and lo + (2 << k) - 1 <= hi:
+                k += 1
+            stream |= self._high_bits(k, lo >> k)
+            lo += 1 << k
+        return stream
+
+    def _high_bits(self, k, high):
+        key = (k, high)
+        if key not in self.cache:
+            stream = self._high_bits(k + 1, high >> 1)
+            if high & 1:
+                stream &= self.basis_bits[k]
+            else:
+                stream &= ~self.basis_bits[k]
+            self.cache[key] = stream
+        return self.cache[key]
+
+def build_trie(literals):
+    """Arrange literals (as UTF-8 bytes) in a trie. Each node is (children dict, literals ending here)."""
+    root = ({}, [])
+    for literal in literals:
+        node = root
+        for b in literal.encode() if isinstance(literal, str) else literal:
+            node = node[0].setdefault(b, ({}, []))
+        node[1].append(literal)
+    return root
+
+def match_literals_basis(literals, basis_bits, length):
+    """
+    Return {literal: match-end marker stream} for every literal, given the basis bit streams.
+
+    Args:
+        literals (iterable of str or bytes): The literals to match. Empty literals are ignored.
+        basis_bits (list of int): The eight basis bit streams of the input (see transpose_bytes).
+        length (int): The number of bytes in the input.
+    """
+    literals = [literal for literal in literals if literal]
+    classes = ByteClassStreams(basis_bits, length)
+    root = build_trie(literals)
+    markers = dict.fromkeys(literals, 0)
+    stack = [(child, classes.byte(b)) for b, child in root[0].items()]
+    while stack:
+        (children, ends), stream = stack.pop()
+        if not stream: # no occurrences of this prefix, so none of its extensions either
+            continue
+        for literal in ends:
+            markers[literal] = stream
+        advanced = Advance(stream)
+        for b, child in children.items():
+            stack.append((child, advanced & classes.byte(b)))
+    return markers
+
+def match_literals(literals, text):
+    """
+    Return {literal: match-end marker stream} for every literal in text (str or UTF-8 bytes).
+
+    Example:
+        text =     ERROR, WARN, WARNING
+        literals = ["WARN", "WARNING", "ERROR"]
+
+        ERROR:     ....1...............
+        WARN:      ..........1.....1...
+        WARNING:   ...................1
+        (streams printed in reading order, as by bitstream2string)
+    """
+    byte_data = text.encode() if isinstance(text, str) else text
+    return match_literals_basis(literals, transpose_bytes(byte_data), len(byte_data))
@@ -564,6 +564,42 @@ def apply_pdep(bp_bit_streams, bp_stream_idx, pdep_marker_stream, source_bit_str
         # reset pdep_marker_stream bits belonging to the field we just processed
         pdep_marker_stream = pdep_marker_stream & ~((1 << (leading_zeroes + fw)) - 1)
 
+def byte_class_stream(byte_data, byte_values):
+    """Create a marker stream with a 1 bit for every byte of byte_data that is in byte_values.
+
+    Rather than testing the bytes one at a time, we use bytes.translate to map every byte to an
+    ASCII '1' or '0', reverse the result (bit streams grow right to left) and let int() parse it
+    as a base 2 number. Both steps run in C, so this is fast enough for very large inputs.
+
+    Args:
+        byte_data (bytes): The byte stream to scan.
+        byte_values (iterable of int): The byte values (0-255) that belong to the class.
+    Returns:
+        class_stream (int): Bit i is set iff byte_data[i] is in byte_values.
+    Example:
+        byte_data = b'ab a'
+        byte_values = [ord('a')]
+
+        class_stream = 1001
+    """
+    if not byte_data:
+        return 0
+    table = bytearray(b'0' * 256)
+    for byte in byte_values:
+        table[byte] = ord('1')
+    return int(byte_data.translate(bytes(table))[::-1], 2)
+
+def transpose_bytes(byte_data):
+    """Decompose byte_data into eight parallel (basis) bit streams.
+
+    Same result as serial_to_parallel on the decoded text, but built with one byte_class_stream
+    call per bit position instead of a Python loop over every bit of every byte.
+
+    Returns:
+        basis_bits (list of int): basis_bits[i] holds bit i of every byte (bit 0 least significant).
+    """
+    return [byte_class_stream(byte_data, [b for b in range(256) if (b >> i) & 1]) for i in range(8)]
+
 class BitStream:
     """Workaround to allow pass-by-value for ints."""
     def __init__(self, value):
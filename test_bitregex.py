@@ -0,0 +1,75 @@
+"""
+Contains functions to test the bitstream regular expression engine against Python's re module.
+"""
+import re
+import unittest
+import bitregex
+import pablo
+
+def re_match_ends(pattern, text):
+    """
+    Reference implementation: set the bit of the last byte of every non-empty substring of text
+    that fully matches pattern. Quadratic, so only suitable for short texts.
+    """
+    compiled = re.compile(pattern, re.ASCII)
+    marker = 0
+    byte_offset = 0
+    char_end_offsets = [] # byte offset of the last byte of each character
+    for c in text:
+        byte_offset += len(c.encode())
+        char_end_offsets.append(byte_offset - 1)
+    for end in range(1, len(text) + 1):
+        if any(compiled.fullmatch(text, start, end) for start in range(end)):
+            marker |= 1 << char_end_offsets[end - 1]
+    return marker
+
+PATTERNS = [
+    "cool", "you're|they're", "c[aeiou]+l", "[a-f]+", "[^ \n]+", "o*", "(ho|mi|es)+", "e{2}", "a{2,4}",
+    "t(o|h)?e", "(?:re)*ally", ".r.", "\\w+!", "\\d|\\s\\S", "(a|b)*c", "x?y?z?", "[.:)]", "o{1,}l",
+    "(re|ee)+a", "a*a*b", "(a*b|c)*d", "i[^a]",
+]
+
+UNICODE_PATTERNS = [
+    "한국", "한국(의|을|은)?", "[가-힣]+", "[^가-힣 \n]+", "조선(반도)?", "(고려|조선)+", ".다", "[一-龥]{2}",
+    "\\(.{1,3}\\)", "[0-9]+년", "Co?r[a-z]+", "[^\x00-\x7f]{3}",
+]
+
+class TestBitRegex(unittest.TestCase):
+    def check_patterns(self, patterns, text):
+        markers = bitregex.match_ends_many(patterns, text)
+        for pattern in patterns:
+            self.assertEqual(pablo.bitstream2string(re_match_ends(pattern, text), len(text.encode())),
+                             pablo.bitstream2string(markers[pattern], len(text.encode())), pattern)
+
+    def test_wctest(self):
+        self.check_patterns(PATTERNS, pablo.readfile("Resources/wctest.txt"))
+
+    def test_unicodetest(self):
+        """Multi-byte characters and classes, on the first few lines of unicodetest.txt."""
+        with open("Resources/unicodetest.txt", encoding='utf-8') as f:
+            text = f.read()[:400]
+        self.check_patterns(UNICODE_PATTERNS, text)
+
+    def test_match_star(self):
+        text = "ab aab b abab"
+        self.assertEqual(".1...1....1.1", pablo.bitstream2string(bitregex.match_ends("a+b", text), len(text)))
+        self.assertEqual(".1...1.1..1.1.", pablo.bitstream2string(bitregex.match_ends("a*b", text + " "), len(text) + 1))
+
+    def test_utf8_sequences(self):
+        for lo, hi in [(0, 0x10FFFF), (0x61, 0x100), (0x7F0, 0x1000), (0xAC00, 0xD7A3), (0xFFF0, 0x10010)]:
+            sequences = bitregex.utf8_sequences(lo, hi)
+            for cp in (lo, hi, (lo + hi) // 2, lo + 1, hi - 1):
+                if 0xD800 <= cp <= 0xDFFF:
+                    continue
+                encoded = chr(cp).encode()
+                matching = [s for s in sequences
+                            if len(s) == len(encoded) and all(a <= b <= z for (a, z), b in zip(s, encoded))]
+                self.assertEqual(1, len(matching), hex(cp))
+
+    def test_unsupported_syntax(self):
+        for pattern in ["^a", "a$", "a**", "(?=a)", "\\1", "(a", "a)", "[z-a]", "*"]:
+            with self.assertRaises(ValueError):
+                bitregex.parse(pattern)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Contains functions to test the golden kernel dump generator.
+"""
+import io
+import unittest
+import dump_generator
+import helper_functions
+import pablo
+
+class TestDumpGenerator(unittest.TestCase):
+    """
+    The dumps in Resources were captured by hand from the Parabix PDEP kernel, so the generator
+    must reproduce them exactly.
+    """
+    def generate_console(self, filename, *args, **kwargs):
+        out = io.StringIO()
+        with open(filename, 'rb') as source_file:
+            dump_generator.write_console(dump_generator.generate_block_sets(source_file, *args, **kwargs), out)
+        return out.getvalue()
+
+    def test_unicodetest(self):
+        """Reproduce the dump captured with the 'a' marker stream."""
+        expected = pablo.readfile("Resources/unicodetest_output.txt").split('\n')[:19 * 9]
+        actual = self.generate_console("Resources/unicodetest.txt").split('\n')[:-1]
+        self.assertEqual(expected, actual)
+
+    def test_unicodetest2(self):
+        """Reproduce the dump captured with the dense not(space) marker stream."""
+        expected = pablo.readfile("Resources/unicodetest_dense_output.txt").split('\n')[:19 * 9]
+        actual = self.generate_console("Resources/unicodetest.txt", '[^ ]',
+                                       ['wordstart', '[\\n]', '[ ]', '[a]']).split('\n')[:-1]
+        self.assertEqual(expected, actual)
+
+    def test_small_chunks(self):
+        """
+        Chunk boundaries that split multi-byte characters and words must not change the output.
+        The generated dump must also pass the existing kernel verification.
+        """
+        with open("Resources/pdeptest.txt", 'rb') as source_file:
+            expected = list(dump_generator.generate_block_sets(source_file, '[^₥Ø ]', block_width=64))
+        with open("Resources/pdeptest.txt", 'rb') as source_file:
+            actual = list(dump_generator.generate_block_sets(source_file, '[^₥Ø ]', block_width=64, chunk_size=5))
+        self.assertEqual(expected, actual)
+        self.assertEqual(2, len(actual))
+        helper_functions.compare_expected_actual(self, actual, block_width=64)
+
+    def test_binary_round_trip(self):
+        """Block sets written with write_binary are read back unchanged."""
+        with open("Resources/wctest.txt", 'rb') as source_file:
+            block_sets = list(dump_generator.generate_block_sets(source_file))
+        out = io.BytesIO()
+        dump_generator.write_binary(block_sets, out)
+        self.assertEqual(block_sets, list(dump_generator.read_binary(io.BytesIO(out.getvalue()))))
+
+    def test_parse_class_spec(self):
+        self.assertEqual(dump_generator.CharClass(frozenset('\n'), False), dump_generator.parse_class_spec('[\\n]'))
+        self.assertEqual(dump_generator.CharClass(frozenset(' ₴'), True), dump_generator.parse_class_spec('[^ ₴]'))
+        with self.assertRaises(ValueError):
+            dump_generator.parse_class_spec('a')
+
+if __name__ == '__main__':
+    unittest.main()
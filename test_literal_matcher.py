@@ -0,0 +1,51 @@
+"""
+Contains functions to test the bit-parallel multi-literal matcher.
+"""
+import unittest
+import literal_matcher
+import pablo
+
+def find_match_ends(literal, byte_data):
+    """Reference implementation: mark the last byte of every (possibly overlapping) occurrence."""
+    encoded = literal.encode()
+    marker = 0
+    pos = byte_data.find(encoded)
+    while pos != -1:
+        marker |= 1 << (pos + len(encoded) - 1)
+        pos = byte_data.find(encoded, pos + 1)
+    return marker
+
+class TestLiteralMatcher(unittest.TestCase):
+    def check_literals(self, literals, byte_data):
+        markers = literal_matcher.match_literals(literals, byte_data)
+        self.assertEqual(set(literals), set(markers))
+        for literal in literals:
+            self.assertEqual(find_match_ends(literal, byte_data), markers[literal], literal)
+
+    def test_transpose_bytes(self):
+        text = pablo.readfile("Resources/pdeptest.txt")
+        basis_bits = [0] * 8
+        pablo.serial_to_parallel(text, basis_bits)
+        self.assertEqual(basis_bits, pablo.transpose_bytes(text.encode()))
+
+    def test_shared_prefixes(self):
+        """Literals that share prefixes or overlap each other."""
+        self.check_literals(["WARN", "WARNING", "WAR", "ERROR", "RR", "aaa", "a", "missing"],
+                            b"ERROR: WARNING, WARN WAR aaaaa")
+
+    def test_wctest(self):
+        with open("Resources/wctest.txt", 'rb') as f:
+            byte_data = f.read()
+        self.check_literals(["you're", "you", "cool", "homies", "forget", "a", "aaaa", "\n"], byte_data)
+
+    def test_unicodetest(self):
+        """Multi-byte literals are matched as UTF-8 byte sequences."""
+        with open("Resources/unicodetest.txt", 'rb') as f:
+            byte_data = f.read()
+        self.check_literals(["한국", "한국의", "조선", "조선반도", "고려", "Korea", "Corea", "2015"], byte_data)
+
+    def test_empty_input(self):
+        self.assertEqual({"a": 0}, literal_matcher.match_literals(["a", ""], ""))
+
+if __name__ == '__main__':
+    unittest.main()
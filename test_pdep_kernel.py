@@ -4,6 +4,7 @@ Contains functions to test the PDEP Parabix kernel.
 import unittest
 import helper_functions
 import pablo
+import wordstream
 
 class TestPDEPKernel(unittest.TestCase):
     """
@@ -18,6 +19,8 @@ class TestPDEPKernel(unittest.TestCase):
     result_swizzle is the swizzled results. We pass the source blocks to the Python function and compare the results
     to result_swizzle.
     """
+    backend = pablo # module providing apply_pdep and get_popcount
+
     def test_wctest(self):
         """
         Verifies the behaviour of the Parabix PDEP kernel when the pdep kernel pipeline
@@ -36,7 +39,7 @@ class TestPDEPKernel(unittest.TestCase):
         result_swizzle                           = 17 eb bf 7e ff f8 00 00 08 14 40 81 00 00 00 00 00 00 00 00 02 00 00 00 10 28 81 02 04 00 00 00""",
         4, num_block_sets)
         
-        helper_functions.compare_expected_actual(self, block_sets)
+        helper_functions.compare_expected_actual(self, block_sets, backend=self.backend)
 
     def test_pdeptest(self):
         """
@@ -56,7 +59,7 @@ class TestPDEPKernel(unittest.TestCase):
         result_swizzle                           = 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00""", 
         4, num_block_sets)
 
-        helper_functions.compare_expected_actual(self, block_sets)
+        helper_functions.compare_expected_actual(self, block_sets, backend=self.backend)
 
     def test_unicodetest(self):
         """
@@ -66,7 +69,7 @@ class TestPDEPKernel(unittest.TestCase):
         num_block_sets = 19
         block_sets = helper_functions.format_values(pablo.readfile("Resources/unicodetest_output.txt"), 4, num_block_sets)
 
-        helper_functions.compare_expected_actual(self, block_sets)
+        helper_functions.compare_expected_actual(self, block_sets, backend=self.backend)
 
     def test_unicodetest2(self):
         """
@@ -79,8 +82,40 @@ class TestPDEPKernel(unittest.TestCase):
         num_block_sets = 19
         block_sets = helper_functions.format_values(pablo.readfile("Resources/unicodetest_dense_output.txt"), 4, num_block_sets)
 
-        helper_functions.compare_expected_actual(self, block_sets)
+        helper_functions.compare_expected_actual(self, block_sets, backend=self.backend)
         
+    def test_mismatch_report(self):
+        """
+        Verifies that a corrupted result_swizzle bit is traced back to the block set, swizzle lane,
+        field, bit offset and source character it came from.
+        """
+        num_block_sets = 19
+        block_sets = helper_functions.format_values(pablo.readfile("Resources/unicodetest_dense_output.txt"), 4, num_block_sets)
+        with open("Resources/unicodetest.txt", "rb") as f:
+            source_bytes = f.read()
+        input_blocks, pdep_ms, output_blocks = block_sets[3]
+        corrupted = list(output_blocks)
+        corrupted[2] ^= 1 << (64 + 5) # lane 2, field 1, bit offset 5 -> byte 3 * 256 + 2 * 64 + 5
+        block_sets[3] = (input_blocks, pdep_ms, corrupted)
+
+        mismatches = helper_functions.locate_mismatches(corrupted, output_blocks, 3)
+        self.assertEqual(1, len(mismatches))
+        mismatch = mismatches[0]
+        self.assertEqual((3, 2, 1, 5, 901), mismatch[:5])
+        char_start, character = helper_functions.char_at_byte_offset(source_bytes, mismatch.source_offset)
+        self.assertEqual(source_bytes[char_start:].decode('utf-8', errors='ignore')[0], character)
+
+        with self.assertRaises(AssertionError) as context:
+            helper_functions.compare_expected_actual(self, block_sets, source_bytes=source_bytes, backend=self.backend)
+        report = str(context.exception)
+        self.assertIn("block set 3, swizzle lane 2, field 1, bit offset 5", report)
+        self.assertIn("source byte 901", report)
+        self.assertIn(repr(character), report)
+
+class TestPDEPKernelWordStream(TestPDEPKernel):
+    """Runs the same kernel tests with the word-array backend's apply_pdep and get_popcount."""
+    backend = wordstream
+
 if __name__ == '__main__':
     t = TestPDEPKernel()
     TestPDEPKernel.test_unicodetest(t)
@@ -0,0 +1,114 @@
+"""
+Contains functions to test the word-array bit stream backend against the int implementation in pablo.py.
+"""
+import random
+import unittest
+import pablo
+import wordstream
+from wordstream import WordStream
+
+LENGTH = 300 # deliberately not a multiple of the word width
+
+class TestWordStream(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(2012)
+        self.mask = (1 << LENGTH) - 1
+
+    def random_stream(self, density=0.5):
+        return sum(1 << i for i in range(LENGTH) if self.rng.random() < density)
+
+    def test_int_round_trip(self):
+        for _ in range(20):
+            x = self.random_stream()
+            self.assertEqual(x, WordStream.from_int(x, LENGTH).to_int())
+        self.assertEqual(0, WordStream(LENGTH).to_int())
+
+    def test_bitwise_and_arithmetic(self):
+        for _ in range(20):
+            x, y = self.random_stream(), self.random_stream()
+            wx, wy = WordStream.from_int(x, LENGTH), WordStream.from_int(y, LENGTH)
+            self.assertEqual(x & y, (wx & wy).to_int())
+            self.assertEqual(x | y, (wx | wy).to_int())
+            self.assertEqual(x ^ y, (wx ^ wy).to_int())
+            self.assertEqual(~x & self.mask, (~wx).to_int())
+            self.assertEqual((x + y) & self.mask, (wx + wy).to_int())
+            self.assertEqual((x - y) & self.mask, (wx - wy).to_int())
+            for shift in (1, 5, 64, 130, LENGTH):
+                self.assertEqual((x << shift) & self.mask, (wx << shift).to_int())
+                self.assertEqual(x >> shift, (wx >> shift).to_int())
+
+    def test_in_place_updates(self):
+        x, y = self.random_stream(), self.random_stream()
+        wx = WordStream.from_int(x, LENGTH)
+        words = wx.words
+        wx += y
+        wx &= ~y & self.mask
+        self.assertIs(words, wx.words)
+        self.assertEqual(pablo.ScanThru(x, y), wx.to_int())
+
+    def test_in_place_shift_helpers(self):
+        """_lshift and _rshift write straight into out, and are correct when out is the source."""
+        for shift in (0, 1, 5, 64, 130, LENGTH):
+            x = self.random_stream()
+            wx = WordStream.from_int(x, LENGTH)
+            self.assertIs(wx, wx._lshift(shift, wx))
+            self.assertEqual((x << shift) & self.mask, wx.to_int())
+            wx = WordStream.from_int(x, LENGTH)
+            self.assertIs(wx, wx._rshift(shift, wx))
+            self.assertEqual(x >> shift, wx.to_int())
+
+    def test_length_mismatch(self):
+        with self.assertRaisesRegex(ValueError, "10 and 20"):
+            WordStream.from_int(5, 10) & WordStream.from_int(5, 20)
+
+    def test_zero_copy_slice(self):
+        x = self.random_stream()
+        wx = WordStream.from_int(x, LENGTH)
+        block = wx[128:256]
+        self.assertEqual((x >> 128) & ((1 << 128) - 1), block.to_int())
+        block |= (1 << 128) - 1
+        self.assertEqual(x | (((1 << 128) - 1) << 128), wx.to_int())
+        tail = wx[256:]
+        self.assertEqual(LENGTH - 256, len(tail))
+        wx[0:64] = 0
+        self.assertEqual(0, wx[0:64].to_int())
+        with self.assertRaises(ValueError):
+            wx[3:64]
+
+    def test_pablo_operations(self):
+        """The word-level operations agree with pablo.py."""
+        self.addCleanup(setattr, pablo, 'EOF_mask', pablo.EOF_mask)
+        pablo.EOF_mask = self.mask
+        for _ in range(20):
+            cursors, scan = self.random_stream(0.1), self.random_stream(0.7)
+            wc, ws = WordStream.from_int(cursors, LENGTH), WordStream.from_int(scan, LENGTH)
+            self.assertEqual(pablo.Advance(cursors) & self.mask, wordstream.Advance(wc).to_int())
+            self.assertEqual(pablo.ScanThru(cursors, scan) & self.mask, wordstream.ScanThru(wc, ws).to_int())
+            self.assertEqual(pablo.ScanTo(cursors, scan) & self.mask, wordstream.ScanTo(wc, ws).to_int())
+            self.assertEqual(pablo.AdvanceThenScanThru(cursors, scan) & self.mask,
+                             wordstream.AdvanceThenScanThru(wc, ws).to_int())
+            self.assertEqual(pablo.AdvanceThenScanTo(cursors, scan) & self.mask,
+                             wordstream.AdvanceThenScanTo(wc, ws).to_int())
+            # pablo's own operator-based functions also run unchanged on WordStreams
+            self.assertEqual(pablo.ScanThru(cursors, scan) & self.mask, pablo.ScanThru(wc, ws).to_int())
+            self.assertEqual(((((cursors & scan) + scan) ^ scan) | cursors) & self.mask,
+                             wordstream.MatchStar(wc, ws).to_int())
+            self.assertEqual(pablo.get_popcount(scan), wordstream.get_popcount(ws))
+            self.assertEqual(pablo.count_forward_zeroes(cursors), wordstream.count_forward_zeroes(wc))
+            self.assertEqual(pablo.apply_pext(scan, cursors), wordstream.apply_pext(ws, wc).to_int())
+            bp_bit_streams = [scan, WordStream.from_int(scan, LENGTH)]
+            pablo.apply_pdep(bp_bit_streams, 0, cursors, scan >> 7)
+            wordstream.apply_pdep(bp_bit_streams, 1, wc, ws >> 7)
+            self.assertEqual(bp_bit_streams[0], bp_bit_streams[1].to_int())
+        self.assertEqual(LENGTH, wordstream.count_forward_zeroes(WordStream(LENGTH)))
+
+    def test_spans(self):
+        starts = 0b000100000100000001
+        ends = 0b010000010000001000
+        ws, we = WordStream.from_int(starts, LENGTH), WordStream.from_int(ends, LENGTH)
+        self.assertEqual(pablo.SpanUpTo(starts, ends), wordstream.SpanUpTo(ws, we).to_int())
+        self.assertEqual(pablo.InclusiveSpan(starts, ends), wordstream.InclusiveSpan(ws, we).to_int())
+        self.assertEqual(pablo.ExclusiveSpan(starts, ends), wordstream.ExclusiveSpan(ws, we).to_int())
+
+if __name__ == '__main__':
+    unittest.main()
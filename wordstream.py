@@ -0,0 +1,382 @@
+#
+# wordstream.py
+#
+# Word-array bit stream backend for the pablo operations.
+#
+#----------------------------------------------------------------------------
+#
+# pablo.py represents every stream as a Python int, so every operation
+# allocates a new object the size of the whole stream. A WordStream is a
+# fixed-length bit stream stored as an array of 64 bit words, least
+# significant word first (same little-endian convention as pablo.py).
+# Operations are word-level loops, can update a stream in place, and
+# word-aligned slices are views that share memory with the parent stream.
+#
+# WordStream implements the int operators (&, |, ^, ~, +, -, <<, >>) with
+# fixed-length semantics: ~ complements within the stream length and bits
+# shifted or carried past the end are dropped. Because of that the
+# operator-based functions in pablo.py (ScanThru, InclusiveSpan, ...) also
+# run unchanged on WordStreams. Int operands are converted to the length
+# of the WordStream they are combined with.
+#
+#----------------------------------------------------------------------------
+#
+import operator
+import sys
+from array import array
+from itertools import repeat
+
+WORD_WIDTH = 64
+WORD_MASK = (1 << WORD_WIDTH) - 1
+
+def _words_from_int(value, num_words):
+    words = array('Q')
+    words.frombytes((value & ((1 << (num_words * WORD_WIDTH)) - 1)).to_bytes(num_words * 8, 'little'))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+class WordStream:
+    """Fixed-length bit stream backed by an array of uint64 words."""
+    def __init__(self, length, words=None):
+        """Create a stream of length bits. words (array('Q') or memoryview) is used without copying."""
+        num_words = (length + WORD_WIDTH - 1) // WORD_WIDTH
+        if words is None:
+            words = array('Q', bytes(num_words * 8))
+        if len(words) != num_words:
+            raise ValueError("A stream of %d bits needs %d words, got %d" % (length, num_words, len(words)))
+        self.length = length
+        self.words = memoryview(words) if isinstance(words, array) else words
+
+    @classmethod
+    def from_int(cls, value, length=None):
+        """Convert an int stream to a WordStream. Bits at or above length are dropped."""
+        if length is None:
+            length = max(value.bit_length(), 1)
+        return cls(length, _words_from_int(value, (length + WORD_WIDTH - 1) // WORD_WIDTH))
+
+    def to_int(self):
+        if sys.byteorder == 'big':
+            words = array('Q', self.words)
+            words.byteswap()
+            return int.from_bytes(words.tobytes(), 'little')
+        return int.from_bytes(self.words, 'little')
+
+    __int__ = to_int
+
+    def copy(self):
+        return WordStream(self.length, array('Q', self.words))
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        """Zero-copy slice. Slice bounds must be multiples of WORD_WIDTH (or the stream length)."""
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("WordStreams only support contiguous slices")
+        start, stop, _ = key.indices(self.length)
+        stop = max(start, stop)
+        if start % WORD_WIDTH or (stop % WORD_WIDTH and stop != self.length):
+            raise ValueError("Slice bounds must be word aligned")
+        first_word = start // WORD_WIDTH
+        return WordStream(stop - start, self.words[first_word:first_word + (stop - start + WORD_WIDTH - 1) // WORD_WIDTH])
+
+    def __setitem__(self, key, value):
+        """Copy value into a word-aligned slice of this stream, e.g. stream[256:512] = block."""
+        view = self[key]
+        view.words[:] = _as_word_stream(value, view.length).words
+
+    def __repr__(self):
+        return "WordStream(%d, %s)" % (self.length, hex(self.to_int()))
+
+    def __eq__(self, other):
+        if isinstance(other, WordStream):
+            return self.length == other.length and self.words == other.words
+        if isinstance(other, int):
+            return self.to_int() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __bool__(self):
+        return any_bits(self)
+
+    def _mask_last_word(self):
+        """Clear the bits past the end of the stream, which some word operations can set."""
+        extra = len(self.words) * WORD_WIDTH - self.length
+        if extra:
+            self.words[-1] &= WORD_MASK >> extra
+
+    # Bitwise operations
+    def _bitwise(self, other, op, out=None):
+        other = _as_word_stream(other, self.length)
+        if out is None:
+            return WordStream(self.length, array('Q', map(op, self.words, other.words)))
+        words = out.words
+        for i, (a, b) in enumerate(zip(self.words, other.words)):
+            words[i] = op(a, b)
+        return out
+
+    def __and__(self, other):
+        return self._bitwise(other, operator.and_)
+
+    def __or__(self, other):
+        return self._bitwise(other, operator.or_)
+
+    def __xor__(self, other):
+        return self._bitwise(other, operator.xor)
+
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+    def __iand__(self, other):
+        return self._bitwise(other, operator.and_, self)
+
+    def __ior__(self, other):
+        return self._bitwise(other, operator.or_, self)
+
+    def __ixor__(self, other):
+        return self._bitwise(other, operator.xor, self)
+
+    def __invert__(self):
+        result = WordStream(self.length, array('Q', map(operator.xor, self.words, repeat(WORD_MASK))))
+        result._mask_last_word()
+        return result
+
+    def andnot(self, other):
+        """self & ~other in a single pass."""
+        other = _as_word_stream(other, self.length)
+        return WordStream(self.length, array('Q', [a & ~b & WORD_MASK for a, b in zip(self.words, other.words)]))
+
+    # Arithmetic: carries and borrows propagate from word to word
+    def _add(self, other, out):
+        other = _as_word_stream(other, self.length)
+        words = out.words
+        carry = 0
+        for i, (a, b) in enumerate(zip(self.words, other.words)):
+            total = a + b + carry
+            words[i] = total & WORD_MASK
+            carry = total >> WORD_WIDTH
+        out._mask_last_word()
+        return out
+
+    def _sub(self, other, out):
+        other = _as_word_stream(other, self.length)
+        words = out.words
+        borrow = 0
+        for i, (a, b) in enumerate(zip(self.words, other.words)):
+            diff = a - b - borrow
+            words[i] = diff & WORD_MASK
+            borrow = diff < 0
+        out._mask_last_word()
+        return out
+
+    def __add__(self, other):
+        return self._add(other, WordStream(self.length))
+
+    def __sub__(self, other):
+        return self._sub(other, WordStream(self.length))
+
+    def __rsub__(self, other):
+        return _as_word_stream(other, self.length) - self
+
+    __radd__ = __add__
+
+    def __iadd__(self, other):
+        return self._add(other, self)
+
+    def __isub__(self, other):
+        return self._sub(other, self)
+
+    # Shifts. << moves bits towards higher positions (Advance), >> towards position 0.
+    # There are deliberately no in-place shifts: pablo.py functions such as count_forward_zeroes
+    # use "strm >>= n" on their arguments and must not clobber the caller's stream.
+    def __lshift__(self, amount):
+        return self._lshift(amount, WordStream(self.length))
+
+    def __rshift__(self, amount):
+        return self._rshift(amount, WordStream(self.length))
+
+    def _lshift(self, amount, out):
+        if amount < 0:
+            raise ValueError("negative shift count")
+        word_shift, bit_shift = divmod(amount, WORD_WIDTH)
+        src = self.words
+        words = out.words
+        num_words = len(src)
+        # walk from the top down so an aliased out never overwrites a source word still to be read
+        for i in range(num_words - 1, word_shift - 1, -1):
+            value = src[i - word_shift] << bit_shift
+            if bit_shift and i - word_shift > 0:
+                value |= src[i - word_shift - 1] >> (WORD_WIDTH - bit_shift)
+            words[i] = value & WORD_MASK
+        for i in range(min(word_shift, num_words)):
+            words[i] = 0
+        out._mask_last_word()
+        return out
+
+    def _rshift(self, amount, out):
+        if amount < 0:
+            raise ValueError("negative shift count")
+        word_shift, bit_shift = divmod(amount, WORD_WIDTH)
+        src = self.words
+        words = out.words
+        num_words = len(src)
+        # walk from the bottom up so an aliased out never overwrites a source word still to be read
+        for i in range(num_words - word_shift):
+            value = src[i + word_shift] >> bit_shift
+            if bit_shift and i + word_shift + 1 < num_words:
+                value |= (src[i + word_shift + 1] << (WORD_WIDTH - bit_shift)) & WORD_MASK
+            words[i] = value
+        for i in range(max(num_words - word_shift, 0), num_words):
+            words[i] = 0
+        return out
+
+def _as_word_stream(value, length):
+    if isinstance(value, WordStream):
+        if value.length != length:
+            raise ValueError("Stream lengths differ: %d and %d" % (length, value.length))
+        return value
+    return WordStream.from_int(value, length)
+
+#
+# Pablo operations on WordStreams. Same names and semantics as pablo.py,
+# except that ~ is bounded by the stream length, so no EOF_mask is needed.
+#
+def any_bits(strm):
+    return any(strm.words)
+
+def Advance(stream):
+    return stream << 1
+
+def AdvancebyPos(stream, pos):
+    return stream >> pos
+
+def ScanThru(Cursors, ScanStream):
+    return (Cursors + ScanStream).andnot(ScanStream)
+
+def ScanTo(Cursors, ToStream):
+    return ScanThru(Cursors, ~ToStream)
+
+def ScanToFirst(ScanStream):
+    return ScanTo(WordStream.from_int(1, ScanStream.length), ScanStream)
+
+def AdvanceThenScanThru(marker, scanclass):
+    return ScanThru(marker, marker | scanclass)
+
+def AdvanceThenScanTo(marker, scanclass):
+    charclass = ~scanclass
+    return (marker + (charclass | marker)).andnot(charclass)
+
+def MatchStar(marker, charclass):
+    """Positions reachable from marker by matching zero or more charclass positions."""
+    return (((marker & charclass) + charclass) ^ charclass) | marker
+
+def SpanUpTo(starts, ends):
+    return ends - starts
+
+def InclusiveSpan(starts, ends):
+    return (ends - starts) | ends
+
+def ExclusiveSpan(starts, ends):
+    return (ends - starts).andnot(starts)
+
+def get_popcount(bits):
+    if isinstance(bits, int):
+        return bits.bit_count()
+    return sum(word.bit_count() for word in bits.words)
+
+def count_forward_zeroes(strm):
+    """Count zeroes starting from position 0. Returns the stream length if there are no 1 bits."""
+    for i, word in enumerate(strm.words):
+        if word:
+            return i * WORD_WIDTH + (word & -word).bit_length() - 1
+    return strm.length
+
+def _word_fields(mask_word):
+    """Yield (shift, width) for each run of 1s in a single word, right to left."""
+    while mask_word:
+        shift = (mask_word & -mask_word).bit_length() - 1
+        run = mask_word >> shift
+        width = (~run & (run + 1)).bit_length() - 1
+        yield shift, width
+        mask_word ^= ((1 << width) - 1) << shift
+
+def apply_pext(bit_stream, pext_marker_stream):
+    """Extract the bits of bit_stream at the positions marked in pext_marker_stream.
+
+    Returns a WordStream of the same length, with the extracted bits packed at the low end.
+    """
+    result = WordStream(bit_stream.length)
+    out = result.words
+    out_word = out_bits = out_idx = 0
+    for word, mask_word in zip(bit_stream.words, pext_marker_stream.words):
+        if mask_word == WORD_MASK:
+            fields = ((0, WORD_WIDTH),)
+        else:
+            fields = _word_fields(mask_word)
+        for shift, width in fields:
+            field = (word >> shift) & ((1 << width) - 1)
+            out_word |= field << out_bits
+            out_bits += width
+            if out_bits >= WORD_WIDTH:
+                out[out_idx] = out_word & WORD_MASK
+                out_idx += 1
+                out_word >>= WORD_WIDTH
+                out_bits -= WORD_WIDTH
+    if out_bits:
+        out[out_idx] = out_word
+    return result
+
+def pdep(source_bit_stream, pdep_marker_stream):
+    """Deposit the low bits of source_bit_stream at the positions marked in pdep_marker_stream."""
+    result = WordStream(pdep_marker_stream.length)
+    out = result.words
+    src = source_bit_stream.words
+    src_idx = 0
+    src_word = src_bits = 0 # buffered source bits not yet deposited
+    for i, mask_word in enumerate(pdep_marker_stream.words):
+        needed = mask_word.bit_count()
+        while src_bits < needed:
+            if src_idx < len(src):
+                src_word |= src[src_idx] << src_bits
+                src_idx += 1
+            src_bits += WORD_WIDTH
+        if mask_word == WORD_MASK:
+            value = src_word & WORD_MASK
+        else:
+            value = 0
+            consumed = 0
+            for shift, width in _word_fields(mask_word):
+                value |= ((src_word >> consumed) & ((1 << width) - 1)) << shift
+                consumed += width
+        out[i] = value
+        src_word >>= needed
+        src_bits -= needed
+    return result
+
+def apply_pdep(bp_bit_streams, bp_stream_idx, pdep_marker_stream, source_bit_stream):
+    """Word-level version of pablo.apply_pdep.
+
+    Zeroes the fields of bp_bit_streams[bp_stream_idx] marked in pdep_marker_stream and deposits
+    source_bit_stream into them. Arguments may be ints or WordStreams; an int target stays an int,
+    so this is a drop-in replacement for pablo.apply_pdep.
+    """
+    target = bp_bit_streams[bp_stream_idx]
+    if isinstance(pdep_marker_stream, WordStream):
+        length = pdep_marker_stream.length
+    elif isinstance(target, WordStream):
+        length = target.length
+    else:
+        length = max(pdep_marker_stream.bit_length(), target.bit_length(), 1)
+    marker = _as_word_stream(pdep_marker_stream, length)
+    if isinstance(source_bit_stream, int):
+        source = WordStream.from_int(source_bit_stream, max(source_bit_stream.bit_length(), 1))
+    else:
+        source = source_bit_stream
+    deposited = pdep(source, marker)
+    if isinstance(target, WordStream):
+        target.words[:] = (target.andnot(marker) | deposited).words
+    else:
+        bp_bit_streams[bp_stream_idx] = (WordStream.from_int(target, length).andnot(marker) | deposited).to_int()